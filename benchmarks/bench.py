@@ -0,0 +1,635 @@
+"""
+Cross-lab performance benchmarks for the course's hot paths.
+
+Each benchmark runs over a list of input sizes and records:
+
+  - wall time     time per call: best / mean / median / stdev over --repeat
+                  samples; each sample loops the call until it lasts at
+                  least --min-time (like timeit's autorange), so fast calls
+                  are not dominated by timer resolution and scheduler noise
+  - throughput    items per second at the median time per call
+  - peak RSS      high-water resident memory of the process running the case
+                  (each case gets a fresh process, so numbers do not leak
+                  between cases; Unix only)
+  - allocations   tracemalloc peak bytes and net new memory blocks for one
+                  extra traced run (traced separately so tracing overhead
+                  does not distort the timings)
+
+Results are written as versioned JSON (schema_version + git commit), and the
+compare command flags cases whose median time per call grew by more than a
+threshold *and* clearly beyond the noise (a few combined stdevs, with no
+overlap between the two runs' samples), or
+whose allocation peak grew by more than the threshold. With --profile, each case also dumps a cProfile
+.prof file (open with snakeviz, or render a flamegraph with flameprof) and
+a text summary of the top functions by cumulative time.
+
+Student exercises (lab04 extract_lsb_message, lab05 add_echo) are timed
+only from a private solutions module passed with --solutions; the public
+repo ships no solutions.
+
+Dependencies: numpy (lab02/04/05 cases), pandas (lab06)
+Usage:
+    python bench.py run [--filter lab03] [--quick] [--repeat 5] [--min-time 0.1]
+                        [--profile DIR]
+    python bench.py compare OLD.json NEW.json [--threshold 0.10]
+"""
+
+import argparse
+import contextlib
+import cProfile
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import platform
+import pstats
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCHEMA_VERSION = 2  # 2: wall_s is per call, timed over calibrated loops
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+# Path to a private module with solved student exercises (see --solutions)
+SOLUTIONS_ENV = 'BENCH_SOLUTIONS'
+
+
+class SkipBenchmark(Exception):
+    """Raised by a setup function when a case cannot run (e.g. a TODO stub)."""
+
+
+class Benchmark:
+    """One hot path, measured at several input sizes.
+
+    Args:
+        name: str, dotted label (lab.function)
+        sizes: list of input sizes; the first one is used by --quick
+        unit: str, what `items(size)` counts (for throughput)
+        setup: callable(size) -> state, not timed; callable(size, workdir)
+               when uses_workdir is set
+        run: callable(state) -> result, timed
+        items: callable(size) -> int, work items per run (default: size)
+        uses_workdir: bool, pass setup a scratch directory that is deleted
+                      when the case finishes
+    """
+
+    def __init__(self, name, sizes, unit, setup, run, items=None,
+                 uses_workdir=False):
+        self.name = name
+        self.sizes = sizes
+        self.unit = unit
+        self.setup = setup
+        self.run = run
+        self.items = items or (lambda size: size)
+        self.uses_workdir = uses_workdir
+
+
+def load_module(name, relpath):
+    """Import a lab script by path (the labs are not packages)."""
+    spec = importlib.util.spec_from_file_location(name, ROOT / relpath)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_solution(function_name):
+    """Fetch a solved student exercise from the private --solutions module.
+
+    Solutions are never kept in this public repository; without a solutions
+    file the case is skipped.
+    """
+    path = os.environ.get(SOLUTIONS_ENV)
+    if not path:
+        raise SkipBenchmark(f"{function_name} is a student exercise "
+                            f"(pass --solutions FILE to time it)")
+    solutions = load_module('solutions', path)
+    if not hasattr(solutions, function_name):
+        raise SkipBenchmark(f"{path} does not define {function_name}")
+    return getattr(solutions, function_name)
+
+
+# -----------------------------------------------------------------------------
+# Lab 01: verificar_es_primo, calcular_factorial
+# -----------------------------------------------------------------------------
+
+def setup_primes(size):
+    return load_module('artifact', 'lab01/data/artifact.py'), size
+
+
+def run_primes(state):
+    artifact, limit = state
+    return sum(1 for n in range(limit) if artifact.verificar_es_primo(n))
+
+
+def setup_factorial(size):
+    return load_module('artifact', 'lab01/data/artifact.py'), size
+
+
+def run_factorial(state):
+    artifact, n = state
+    return artifact.calcular_factorial(n)
+
+
+# -----------------------------------------------------------------------------
+# Lab 03: Character save/load round trips
+# -----------------------------------------------------------------------------
+
+def make_hero(size):
+    """A Character with a `size`-item inventory."""
+    character_module = load_module('character', 'lab03/character.py')
+    hero = character_module.Character("Aragorn", 50)
+    hero.inventory = [f"Item {i}" for i in range(size)]
+    hero.position = (42, 17)
+    return hero
+
+
+def setup_save_text(size, workdir):
+    return make_hero(size), str(Path(workdir) / "hero.txt")
+
+
+def run_save_text(state):
+    hero, path = state
+    hero.save_text(path)
+
+
+def run_dict_roundtrip(hero):
+    return type(hero).from_dict(hero.to_dict())
+
+
+def make_character_setup(save_method, load_method, extension):
+    """Build a setup function for one Character serialization format.
+
+    The size is the inventory length. A trial round trip runs during setup;
+    formats whose methods are still TODO stubs are skipped, not timed.
+    """
+    def setup(size, workdir):
+        hero = make_hero(size)
+        path = str(Path(workdir) / f"hero.{extension}")
+        save = getattr(hero, save_method)
+        load = getattr(type(hero), load_method)
+        save(path)
+        loaded = load(path)
+        if loaded is None or loaded.inventory != hero.inventory:
+            raise SkipBenchmark(f"Character.{save_method}/{load_method} "
+                                f"not implemented (round trip failed)")
+        return save, load, path
+    return setup
+
+
+def run_character(state):
+    save, load, path = state
+    save(path)
+    return load(path)
+
+
+# -----------------------------------------------------------------------------
+# Lab 06: generate_consumo_municipal
+# -----------------------------------------------------------------------------
+
+def setup_consumo(size, workdir):
+    import pandas as pd
+
+    generate_data = load_module('generate_data', 'lab06/generate_data.py')
+    # Never overwrite the lab's real CSVs
+    generate_data.DATA_DIR = Path(workdir)
+    base = generate_data.MUNICIPIOS
+    rows = [{"municipio": f"{base[i % len(base)][0]} {i}",
+             "poblacion": base[i % len(base)][2]} for i in range(size)]
+    return generate_data, pd.DataFrame(rows)
+
+
+def run_consumo(state):
+    generate_data, stats_df = state
+    with contextlib.redirect_stdout(io.StringIO()):
+        return generate_data.generate_consumo_municipal(stats_df)
+
+
+# -----------------------------------------------------------------------------
+# Notebook code (see reference.py) and solved exercises (--solutions)
+# -----------------------------------------------------------------------------
+
+def setup_extract_strings(size):
+    import numpy as np
+
+    rng = np.random.default_rng(3084)
+    data = bytearray(rng.integers(0, 256, size, dtype=np.uint8).tobytes())
+    # Sprinkle readable text so there is something to find
+    for offset in range(0, size - 64, 4096):
+        data[offset:offset + 24] = b"EVIDENCE: the key is 42\x00"
+    return bytes(data)
+
+
+def run_extract_strings(state):
+    import reference
+    return reference.extract_strings(state, min_length=8)
+
+
+def setup_box_blur(size):
+    import numpy as np
+
+    rng = np.random.default_rng(3084)
+    return rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+
+
+def run_box_blur(state):
+    import reference
+    return reference.box_blur(state, kernel_size=3)
+
+
+def setup_scan(size):
+    import numpy as np
+
+    rng = np.random.default_rng(3084)
+    return rng.integers(0, 256, (size, size), dtype=np.uint8)
+
+
+def run_scan(state):
+    import reference
+    return reference.scan(state)
+
+
+def setup_assemble(size):
+    import numpy as np
+
+    rng = np.random.default_rng(3084)
+    return rng.integers(0, 2, size, dtype=np.uint8)
+
+
+def run_assemble(state):
+    import reference
+    return reference.assemble(state)
+
+
+def make_stego_image(size):
+    """Build a stego image hiding a `size`-character message (lab04 protocol)."""
+    import numpy as np
+
+    rng = np.random.default_rng(3084)
+    message = ''.join(chr(c) for c in rng.integers(32, 127, size))
+    bits = [int(b) for b in format(size, '032b')]
+    for char in message:
+        bits.extend(int(b) for b in format(ord(char), '08b'))
+    side = int(np.ceil(np.sqrt(len(bits))))
+    img = rng.integers(0, 256, (side, side, 3), dtype=np.uint8)
+    red = img[:, :, 0].flatten()
+    red[:len(bits)] = (red[:len(bits)] & 0xFE) | np.array(bits, dtype=np.uint8)
+    img[:, :, 0] = red.reshape(side, side)
+    return img
+
+
+def setup_extract_lsb(size):
+    return load_solution('extract_lsb_message'), make_stego_image(size)
+
+
+def run_extract_lsb(state):
+    extract_lsb_message, img = state
+    return extract_lsb_message(img)
+
+
+def setup_add_echo(size):
+    import numpy as np
+
+    add_echo = load_solution('add_echo')
+    rate = 16000
+    t = np.arange(size * rate) / rate
+    return add_echo, (np.sin(2 * np.pi * 220 * t) * 10000).astype(np.int16), rate
+
+
+def run_add_echo(state):
+    add_echo, data, rate = state
+    return add_echo(data, rate, delay_seconds=0.3, decay=0.4)
+
+
+BENCHMARKS = [
+    Benchmark('lab01.verificar_es_primo', [1000, 10000, 100000], 'numbers',
+              setup_primes, run_primes),
+    Benchmark('lab01.calcular_factorial', [100, 1000, 5000], 'multiplications',
+              setup_factorial, run_factorial),
+    Benchmark('lab03.Character.save_text', [10, 1000, 100000], 'items',
+              setup_save_text, run_save_text, uses_workdir=True),
+    Benchmark('lab03.Character.dict_roundtrip', [10, 1000, 100000], 'items',
+              make_hero, run_dict_roundtrip),
+    Benchmark('lab03.Character.text', [10, 1000, 100000], 'items',
+              make_character_setup('save_text', 'load_text', 'txt'), run_character,
+              uses_workdir=True),
+    Benchmark('lab03.Character.json', [10, 1000, 100000], 'items',
+              make_character_setup('save_json', 'load_json', 'json'), run_character,
+              uses_workdir=True),
+    Benchmark('lab03.Character.binary', [10, 1000, 100000], 'items',
+              make_character_setup('save_binary', 'load_binary', 'bin'), run_character,
+              uses_workdir=True),
+    Benchmark('lab03.Character.pickle', [10, 1000, 100000], 'items',
+              make_character_setup('save_pickle', 'load_pickle', 'pkl'), run_character,
+              uses_workdir=True),
+    Benchmark('lab03.Character.json_checksum', [10, 1000, 100000], 'items',
+              make_character_setup('save_json_with_checksum',
+                                   'load_json_with_checksum', 'json'),
+              run_character, uses_workdir=True),
+    Benchmark('lab06.generate_consumo_municipal', [78, 780, 7800], 'rows',
+              setup_consumo, run_consumo, items=lambda size: size * 12,
+              uses_workdir=True),
+    Benchmark('lab02.extract_strings', [10_000, 100_000, 1_000_000], 'bytes',
+              setup_extract_strings, run_extract_strings),
+    Benchmark('lab04.box_blur', [32, 64, 128], 'pixels',
+              setup_box_blur, run_box_blur, items=lambda size: size * size),
+    Benchmark('lab04.scan', [64, 256, 1024], 'pixels',
+              setup_scan, run_scan, items=lambda size: size * size),
+    Benchmark('lab04.assemble', [32, 1024, 65536], 'bits',
+              setup_assemble, run_assemble),
+    Benchmark('lab04.extract_lsb_message', [100, 1000, 10000], 'chars',
+              setup_extract_lsb, run_extract_lsb),
+    Benchmark('lab05.add_echo', [1, 10, 60], 'samples',
+              setup_add_echo, run_add_echo, items=lambda size: size * 16000),
+]
+
+
+# -----------------------------------------------------------------------------
+# Measurement
+# -----------------------------------------------------------------------------
+
+def peak_rss_kb():
+    """High-water resident set size of this process in KiB (None on Windows)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def measure_allocations(benchmark, state):
+    """Trace one run: peak traced bytes and net new blocks still alive after it."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = benchmark.run(state)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del result
+
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore),
+                                                  'filename')
+    return peak, sum(stat.count_diff for stat in diff)
+
+
+def profile_case(benchmark, state, size, profile_dir):
+    """Dump a cProfile of one run as .prof plus a readable text summary."""
+    profile_dir = Path(profile_dir)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    stem = profile_dir / f"{benchmark.name}-{size}"
+
+    profiler = cProfile.Profile()
+    profiler.runcall(benchmark.run, state)
+    profiler.dump_stats(f"{stem}.prof")
+    with open(f"{stem}.txt", 'w') as f:
+        stats = pstats.Stats(profiler, stream=f)
+        stats.sort_stats('cumulative').print_stats(25)
+    return f"{stem}.prof"
+
+
+def calibrate(timer, min_time):
+    """Number of calls per sample so that one sample lasts at least min_time."""
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            return number
+        # Jump close to the target instead of only doubling
+        estimate = number * min_time / max(elapsed, 1e-9)
+        number = max(number * 2, int(estimate * 1.2))
+
+
+def run_case(name, size, repeat, min_time, profile_dir=None):
+    """Measure one (benchmark, size) pair. Runs inside a fresh process."""
+    benchmark = next(b for b in BENCHMARKS if b.name == name)
+    # The scratch directory is removed however the case ends
+    with tempfile.TemporaryDirectory(prefix='bench_') as workdir:
+        return measure_case(benchmark, size, repeat, min_time, profile_dir,
+                            workdir)
+
+
+def measure_case(benchmark, size, repeat, min_time, profile_dir, workdir):
+    record = {'name': benchmark.name, 'size': size, 'unit': benchmark.unit}
+    try:
+        state = (benchmark.setup(size, workdir) if benchmark.uses_workdir
+                 else benchmark.setup(size))
+    except SkipBenchmark as exc:
+        return dict(record, status='skipped', reason=str(exc))
+    except ImportError as exc:
+        return dict(record, status='skipped', reason=f"missing dependency: {exc}")
+    except Exception as exc:
+        # e.g. a half-finished student method called by a round-trip setup;
+        # record it and keep going so the other cases still get reported
+        return dict(record, status='error',
+                    reason=f"setup failed: {type(exc).__name__}: {exc}")
+
+    try:
+        setup_rss = peak_rss_kb()
+        benchmark.run(state)  # warm-up: imports, caches, first-touch pages
+        timer = timeit.Timer(lambda: benchmark.run(state))
+        number = calibrate(timer, min_time)
+        times = [total / number for total in timer.repeat(repeat, number)]
+        run_rss = peak_rss_kb()
+        alloc_peak, alloc_blocks = measure_allocations(benchmark, state)
+        profile = (profile_case(benchmark, state, size, profile_dir)
+                   if profile_dir else None)
+    except Exception as exc:
+        return dict(record, status='error', reason=f"{type(exc).__name__}: {exc}")
+
+    median = statistics.median(times)
+    items = benchmark.items(size)
+    record.update({
+        'status': 'ok',
+        'repeat': repeat,
+        'calls_per_sample': number,
+        'wall_s': {
+            'min': min(times),
+            'mean': statistics.mean(times),
+            'median': median,
+            'max': max(times),
+            'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+        },
+        'items': items,
+        'throughput_per_s': items / median if median > 0 else None,
+        'setup_rss_kb': setup_rss,
+        'peak_rss_kb': run_rss,
+        'alloc_peak_bytes': alloc_peak,
+        'alloc_net_blocks': alloc_blocks,
+    })
+    if profile:
+        record['profile'] = profile
+    return record
+
+
+def run_isolated(name, size, repeat, min_time, profile_dir=None):
+    """Run one case in its own process so peak RSS belongs to that case only."""
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes=1) as pool:
+        return pool.apply(run_case, (name, size, repeat, min_time, profile_dir))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# -----------------------------------------------------------------------------
+# Commands
+# -----------------------------------------------------------------------------
+
+def command_run(args):
+    if args.solutions:
+        # Environment variables reach the spawned per-case processes
+        os.environ[SOLUTIONS_ENV] = str(Path(args.solutions).resolve())
+    selected = [b for b in BENCHMARKS
+                if not args.filter or any(f in b.name for f in args.filter)]
+    if not selected:
+        sys.exit(f"No benchmark matches {args.filter}")
+
+    results = []
+    for benchmark in selected:
+        sizes = benchmark.sizes[:1] if args.quick else benchmark.sizes
+        for size in sizes:
+            runner = run_case if args.no_isolate else run_isolated
+            record = runner(benchmark.name, size, args.repeat, args.min_time,
+                            args.profile)
+            results.append(record)
+            print(format_record(record))
+
+    commit = git_commit()
+    report = {
+        'schema_version': SCHEMA_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'min_time_s': args.min_time,
+        'isolated': not args.no_isolate,
+        'results': results,
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"bench-{datetime.now():%Y%m%d-%H%M%S}"
+        f"{'-' + commit[:8] if commit else ''}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+def format_record(record):
+    label = f"{record['name']:36s} {record['size']:>9}"
+    if record['status'] != 'ok':
+        return f"{label}  {record['status'].upper()}: {record['reason']}"
+    rss = record['peak_rss_kb']
+    return (f"{label}  {record['wall_s']['median'] * 1000:10.3f} ms  "
+            f"{record['throughput_per_s'] or 0:14,.0f} {record['unit']}/s  "
+            f"rss {rss if rss is not None else '-':>8} KiB  "
+            f"alloc {record['alloc_peak_bytes'] / 1024:10.1f} KiB")
+
+
+def load_report(path):
+    with open(path) as f:
+        report = json.load(f)
+    version = report.get('schema_version')
+    if version != SCHEMA_VERSION:
+        sys.exit(f"{path}: schema_version {version} is not supported "
+                 f"(expected {SCHEMA_VERSION})")
+    return {(r['name'], r['size']): r for r in report['results']
+            if r['status'] == 'ok'}
+
+
+def command_compare(args):
+    old = load_report(args.old)
+    new = load_report(args.new)
+    regressions = 0
+
+    print(f"{'Benchmark':36s} {'size':>9} {'old ms':>10} {'new ms':>10} "
+          f"{'time':>8} {'alloc':>8}")
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key]['wall_s'], new[key]['wall_s']
+        time_ratio = after['median'] / before['median']
+        # A slowdown must also clear the noise: the median moved by more
+        # than a few combined stdevs and no new sample was as fast as the
+        # slowest old one
+        noise = args.noise * (before['stdev'] ** 2 + after['stdev'] ** 2) ** 0.5
+        slower = (time_ratio > 1 + args.threshold
+                  and after['median'] - before['median'] > noise
+                  and after['min'] > before['max'])
+        old_alloc = old[key]['alloc_peak_bytes']
+        new_alloc = new[key]['alloc_peak_bytes']
+        alloc_ratio = new_alloc / old_alloc if old_alloc else 1.0
+        flags = []
+        if slower:
+            flags.append('SLOWER')
+        if alloc_ratio > 1 + args.threshold:
+            flags.append('MORE MEMORY')
+        regressions += bool(flags)
+        print(f"{key[0]:36s} {key[1]:>9} "
+              f"{before['median'] * 1000:10.3f} "
+              f"{after['median'] * 1000:10.3f} "
+              f"{time_ratio - 1:+8.1%} {alloc_ratio - 1:+8.1%}  "
+              f"{' '.join(flags)}")
+
+    for key in sorted(old.keys() ^ new.keys()):
+        side = 'old' if key in old else 'new'
+        print(f"{key[0]:36s} {key[1]:>9}  only in {side} results")
+
+    print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}")
+    if regressions:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-lab benchmark harness.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="run benchmarks and write JSON results")
+    run.add_argument('--filter', action='append',
+                     help="only run benchmarks whose name contains this (repeatable)")
+    run.add_argument('--quick', action='store_true', help="smallest size only")
+    run.add_argument('--repeat', type=int, default=5, help="timed samples per case")
+    run.add_argument('--min-time', type=float, default=0.1,
+                     help="minimum seconds per sample; fast calls are looped (default 0.1)")
+    run.add_argument('--profile', metavar='DIR',
+                     help="also dump a cProfile (.prof + .txt) per case to DIR")
+    run.add_argument('--solutions', metavar='FILE',
+                     help="private module defining solved exercises "
+                          "(extract_lsb_message, add_echo); never commit it here")
+    run.add_argument('--output', help="results file (default: results/bench-<time>-<commit>.json)")
+    run.add_argument('--no-isolate', action='store_true',
+                     help="run cases in this process (faster, but peak RSS accumulates)")
+    run.set_defaults(handler=command_run)
+
+    compare = commands.add_parser('compare', help="flag regressions between two result files")
+    compare.add_argument('old')
+    compare.add_argument('new')
+    compare.add_argument('--threshold', type=float, default=0.10,
+                         help="relative slowdown that counts as a regression (default 0.10)")
+    compare.add_argument('--noise', type=float, default=3.0,
+                         help="a slowdown must also exceed this many combined "
+                              "stdevs (default 3)")
+    compare.set_defaults(handler=command_compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
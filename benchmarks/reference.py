@@ -0,0 +1,121 @@
+"""
+Notebook code benchmarked by bench.py.
+
+The lab notebooks define these functions inline, so they cannot be
+imported. The versions below are copied line for line from code the
+notebooks already give students in full. Keep them in sync with the
+notebooks when the labs change.
+
+  - extract_strings      lab02.md, Exercise 2.5 (as a function of the bytes)
+  - box_blur             lab04.md, Part E
+  - assemble, bits_to_symbol, scan
+                         lab04.md, Critical Incident Part B helpers
+
+Student exercises (TODOs and fill-in-the-blank cells) are deliberately not
+reproduced here; bench.py times them only from a private --solutions file.
+"""
+
+import numpy as np
+
+
+# -----------------------------------------------------------------------------
+# Lab 02: The Binary Detective
+# -----------------------------------------------------------------------------
+
+def extract_strings(data, min_length=4):
+    """
+    Extract printable ASCII strings from binary data.
+
+    Args:
+        data (bytes): Raw file contents (BinaryAnalyzer.data in the lab)
+        min_length (int): Minimum string length to extract
+
+    Returns:
+        list: List of extracted strings
+    """
+    strings = []
+    current_string = []
+
+    for byte in data:
+        # Check if byte is printable ASCII (32-126)
+        if 32 <= byte <= 126:
+            current_string.append(chr(byte))
+        else:
+            # End of printable sequence
+            if len(current_string) >= min_length:
+                strings.append(''.join(current_string))
+            current_string = []
+
+    # Don't forget the last string
+    if len(current_string) >= min_length:
+        strings.append(''.join(current_string))
+
+    return strings
+
+
+# -----------------------------------------------------------------------------
+# Lab 04: Pixel Forensics
+# -----------------------------------------------------------------------------
+
+def box_blur(img, kernel_size=3):
+    """Apply box blur using manual convolution.
+
+    Args:
+        img: NumPy array of shape (H, W) or (H, W, 3), dtype uint8
+        kernel_size: Size of the square kernel (must be odd)
+
+    Returns:
+        NumPy array with same shape, dtype uint8
+    """
+    assert kernel_size % 2 == 1, "Kernel size must be odd"
+    pad = kernel_size // 2
+
+    # For color images, blur each channel independently
+    if img.ndim == 3:
+        return np.stack([box_blur(img[:, :, c], kernel_size)
+                         for c in range(img.shape[2])], axis=-1)
+
+    # Pad edges with reflected values to handle border pixels
+    padded = np.pad(img.astype(np.float64), pad, mode='reflect')
+    h, w = img.shape
+    result = np.zeros((h, w), dtype=np.float64)
+
+    # Slide the kernel over every pixel
+    for y in range(h):
+        for x in range(w):
+            # Extract the neighborhood around pixel (y, x)
+            neighborhood = padded[y:y + kernel_size, x:x + kernel_size]
+            # The new pixel value is the mean of the neighborhood
+            result[y, x] = neighborhood.mean()
+
+    return np.clip(result, 0, 255).astype(np.uint8)
+
+
+def assemble(bits):
+    """Reconstruct an integer from a sequence of bits (MSB first).
+
+    Args:    bits -- sequence of 0s and 1s
+    Returns: int
+    """
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def bits_to_symbol(bits):
+    """Convert 8 bits (MSB first) to a single ASCII character.
+
+    Args:    bits -- sequence of exactly 8 values (0 or 1)
+    Returns: str (one character)
+    """
+    return chr(assemble(bits))
+
+
+def scan(channel):
+    """Extract the least significant bit from every element of a 2D array.
+
+    Args:    channel -- 2D NumPy array (H, W), dtype uint8
+    Returns: 1D NumPy array of 0s and 1s
+    """
+    return channel.flatten() & 1
@@ -0,0 +1,389 @@
+"""
+Lab 05: Digital Waves - Streaming Hum Removal
+Block-based denoiser that removes tonal hums without a reference recording.
+
+cancel_noise() only works when the exact noise waveform is known and the
+whole recording is in memory. This pipeline instead sees the audio one small
+block at a time, the way a live microphone feed arrives:
+
+  1. mono   - scale each block to float in [-1, 1] and average its channels
+  2. detect - find persistent spectral peaks (hums) in a running average of
+              past spectra; speech comes and goes, a hum does not
+  3. notch  - for every detected hum, an adaptive LMS canceller learns the
+              hum's amplitude and phase from a sine/cosine reference and
+              subtracts it (the "anti-sound" from Phase 2, learned on the fly)
+
+Only past samples are used, so the algorithmic latency is one block.
+Every stage is timed per block so we can check it keeps up with real time.
+
+Dependencies: numpy, scipy
+Usage: python stream_denoise.py [file.wav ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.io import wavfile
+
+RATE = 16000        # Sample rate used throughout this lab
+BLOCK_SIZE = 256    # 16 ms at 16 kHz
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+def to_float(data):
+    """Scale samples of any WAV sample format to float64 in [-1, 1].
+
+    wavfile.read() returns float WAVs as float32/float64 already in [-1, 1],
+    integer PCM at its stored width (int16; int32 for 24- and 32-bit files)
+    and 8-bit WAVs as uint8 centered on 128.
+    """
+    if np.issubdtype(data.dtype, np.floating):
+        return data.astype(np.float64)
+    if data.dtype == np.uint8:
+        return (data.astype(np.float64) - 128) / 128
+    return data.astype(np.float64) / np.iinfo(data.dtype).max
+
+
+def downmix(x):
+    """Average all channels of a float signal into one (mono passes through)."""
+    return x.mean(axis=1) if x.ndim == 2 else x
+
+
+def stream_blocks(data, block_size=BLOCK_SIZE):
+    """Yield consecutive blocks of a recording, simulating a live feed.
+
+    The last block may be shorter than block_size.
+    """
+    for start in range(0, len(data), block_size):
+        yield data[start:start + block_size]
+
+
+# -----------------------------------------------------------------------------
+# Pipeline Stages
+# -----------------------------------------------------------------------------
+
+class MonoStage:
+    """Convert each incoming block to float64 mono in [-1, 1]."""
+
+    name = 'mono'
+
+    def process(self, block):
+        return downmix(to_float(block))
+
+
+class HumDetector:
+    """Find tonal hums as persistent peaks in a running average spectrum.
+
+    The detector keeps the last n_fft samples it has seen. Every `hop`
+    samples it takes a windowed FFT of that history and folds it into an
+    exponential average. Speech energy moves around between analyses and
+    averages out; a hum stays in the same bin and stands far above the
+    median level of the band.
+
+    Any steady tone counts as a hum -- a sustained musical note will be
+    removed too.
+
+    Blocks pass through unchanged -- the result is `self.frequencies`.
+    """
+
+    name = 'detect'
+
+    def __init__(self, rate=RATE, n_fft=None, hop=None, max_hums=4,
+                 min_freq=40.0, max_freq=2000.0, threshold_db=20.0,
+                 range_db=60.0, smoothing=0.8):
+        if n_fft is None:
+            # About 4 Hz per bin at any sample rate (4096 at 16 kHz)
+            n_fft = 1 << int(np.ceil(np.log2(rate / 4)))
+        self.rate = rate
+        self.n_fft = n_fft
+        self.hop = hop if hop is not None else n_fft // 4
+        self.max_hums = max_hums
+        self.threshold = 10 ** (threshold_db / 20)
+        self.range = 10 ** (-range_db / 20)
+        self.guard = 4  # bins; the Hann main lobe is 2 bins wide either side
+        self.frequencies = []
+
+        bin_freqs = np.fft.rfftfreq(n_fft, d=1.0 / rate)
+        self._band = np.nonzero((bin_freqs >= min_freq) &
+                                (bin_freqs <= max_freq))[0]
+        self._window = np.hanning(n_fft)
+        self._history = np.zeros(n_fft)
+        self._seen = 0
+        self._since_analysis = 0
+        self._smoothing = smoothing
+        self._average = None
+
+    def process(self, block):
+        samples = block.astype(np.float64)
+        n = len(samples)
+        if n >= self.n_fft:
+            self._history[:] = samples[-self.n_fft:]
+        else:
+            self._history[:-n] = self._history[n:]
+            self._history[-n:] = samples
+        self._seen += n
+        self._since_analysis += n
+
+        # Wait for a full window of real audio before the first analysis
+        if self._seen >= self.n_fft and self._since_analysis >= self.hop:
+            self._since_analysis = 0
+            self._analyze()
+        return block
+
+    def _analyze(self):
+        spectrum = np.abs(np.fft.rfft(self._history * self._window))
+        if self._average is None:
+            self._average = spectrum
+        else:
+            self._average = (self._smoothing * self._average
+                             + (1 - self._smoothing) * spectrum)
+
+        band = self._average[self._band]
+        floor = np.median(band) + 1e-12
+        # A hum is a local maximum that stands threshold_db above both the
+        # band's median and the bins `guard` away on either side. The second
+        # test rejects ripples on the leakage skirt of a loud tone and broad
+        # bumps of averaged speech energy.
+        g = self.guard
+        center = band[g:-g]
+        is_peak = ((center > band[g - 1:-g - 1])
+                   & (center >= band[g + 1:len(band) - g + 1])
+                   & (center > self.threshold * np.maximum(band[:-2 * g],
+                                                           band[2 * g:]))
+                   & (center > self.threshold * floor))
+        peaks = np.nonzero(is_peak)[0] + g
+        if len(peaks):
+            # Ignore peaks more than range_db below the strongest one: on a
+            # clean recording the median is the quantization floor, and its
+            # harmonics would otherwise pass as hums
+            peaks = peaks[band[peaks] >= self.range * band[peaks].max()]
+        strongest = peaks[np.argsort(band[peaks])[::-1][:self.max_hums]]
+
+        frequencies = []
+        for i in strongest:
+            # Parabolic interpolation on log magnitude for sub-bin accuracy
+            a, b, c = np.log(band[i - 1:i + 2] + 1e-12)
+            denom = a - 2 * b + c
+            offset = 0.5 * (a - c) / denom if denom != 0 else 0.0
+            k = self._band[i] + offset
+            frequencies.append(k * self.rate / self.n_fft)
+        self.frequencies = sorted(frequencies)
+
+
+class AdaptiveNotch:
+    """Cancel detected hums with one adaptive LMS notch per frequency.
+
+    For a hum at frequency f, the reference is a cosine/sine pair at f.
+    The filter learns two weights so that w_cos*cos + w_sin*sin matches the
+    hum, then subtracts that estimate -- phase inversion with a learned
+    amplitude and phase. Weights are updated once per block (block LMS) from
+    the residual, so the output for a block only depends on earlier blocks.
+
+    A small frequency error makes the learned phase rotate steadily; that
+    rotation is measured and fed back into the oscillator frequency, so the
+    notch locks onto the hum even if the detector's estimate is slightly off.
+    """
+
+    name = 'notch'
+
+    def __init__(self, rate=RATE, detector=None, step=0.1, track_gain=0.2,
+                 match_hz=3.0):
+        self.rate = rate
+        self.detector = detector
+        self.step = step
+        self.track_gain = track_gain
+        self.match_hz = match_hz
+        self.frequencies = np.zeros(0)
+        self._phase = np.zeros(0)
+        self._weights = np.zeros((0, 2))
+
+    def retune(self, frequencies):
+        """Follow a new set of hum frequencies, keeping state for known hums."""
+        new_freqs, new_phase, new_weights = [], [], []
+        for freq in frequencies:
+            known = np.nonzero(np.abs(self.frequencies - freq) <= self.match_hz)[0]
+            if len(known):
+                # Keep the tracked frequency: it is finer than the detector's
+                i = known[0]
+                new_freqs.append(self.frequencies[i])
+                new_phase.append(self._phase[i])
+                new_weights.append(self._weights[i])
+            else:
+                new_freqs.append(freq)
+                new_phase.append(0.0)
+                new_weights.append(np.zeros(2))
+        self.frequencies = np.array(new_freqs, dtype=np.float64)
+        self._phase = np.array(new_phase, dtype=np.float64)
+        self._weights = np.array(new_weights, dtype=np.float64).reshape(-1, 2)
+
+    def process(self, block):
+        if self.detector is not None:
+            self.retune(self.detector.frequencies)
+        x = np.asarray(block, dtype=np.float64)
+        if len(self.frequencies) == 0:
+            return x
+
+        n = len(x)
+        omega = 2 * np.pi * self.frequencies / self.rate
+        angles = self._phase[:, None] + omega[:, None] * np.arange(n)
+        cos, sin = np.cos(angles), np.sin(angles)
+
+        # Output uses the weights learned from previous blocks only
+        estimate = self._weights[:, 0] @ cos + self._weights[:, 1] @ sin
+        error = x - estimate
+
+        # Normalized block LMS: a sinusoid has energy ~n/2 over n samples
+        old_angle = np.arctan2(self._weights[:, 1], self._weights[:, 0])
+        settled = np.hypot(self._weights[:, 0], self._weights[:, 1]) > 0
+        self._weights[:, 0] += self.step * (cos @ error) / (n / 2)
+        self._weights[:, 1] += self.step * (sin @ error) / (n / 2)
+
+        # Phase drift between blocks reveals the oscillator's frequency error
+        new_angle = np.arctan2(self._weights[:, 1], self._weights[:, 0])
+        drift = np.angle(np.exp(1j * (new_angle - old_angle)))
+        freq_error = -drift * self.rate / (2 * np.pi * n)
+        freq_error = np.clip(freq_error, -self.match_hz, self.match_hz)
+        self.frequencies += np.where(settled, self.track_gain * freq_error, 0.0)
+
+        self._phase = np.mod(self._phase + omega * n, 2 * np.pi)
+        return error
+
+
+# -----------------------------------------------------------------------------
+# The Pipeline
+# -----------------------------------------------------------------------------
+
+class StreamDenoiser:
+    """Run mono -> detect -> notch on a stream of blocks, timing each stage.
+
+    Args:
+        rate: int, sample rate in Hz
+        block_size: int, samples per block (sets the algorithmic latency)
+        max_hums: int, maximum number of hums tracked at once
+        step: float, LMS step size in (0, 1]; larger adapts faster but lets
+              more of the voice leak into the hum estimate
+    """
+
+    def __init__(self, rate=RATE, block_size=BLOCK_SIZE, max_hums=4, step=0.1):
+        self.rate = rate
+        self.block_size = block_size
+        self.detector = HumDetector(rate, max_hums=max_hums)
+        self.notch = AdaptiveNotch(rate, detector=self.detector, step=step)
+        self.stages = [MonoStage(), self.detector, self.notch]
+        self.timings = {stage.name: [] for stage in self.stages}
+
+    @property
+    def latency_ms(self):
+        """Algorithmic latency: one block must be buffered before output."""
+        return 1000.0 * self.block_size / self.rate
+
+    def process(self, block):
+        """Process one block through every stage and return the cleaned block."""
+        for stage in self.stages:
+            start = time.perf_counter()
+            block = stage.process(block)
+            self.timings[stage.name].append(time.perf_counter() - start)
+        return block
+
+    def run(self, data):
+        """Push a whole recording through the pipeline block by block.
+
+        Returns:
+            NumPy array of shape (N,), dtype float64 on the [-1, 1] scale,
+            whatever the sample format of `data`
+        """
+        cleaned = [self.process(block)
+                   for block in stream_blocks(data, self.block_size)]
+        if not cleaned:
+            return np.zeros(0)
+        return np.concatenate(cleaned)
+
+    def report(self):
+        """Summarize per-block processing time for each stage.
+
+        Returns:
+            dict: stage name -> {'mean_ms', 'p95_ms', 'max_ms'}, plus
+                  'total' for the whole pipeline, 'budget_ms' (real time
+                  available per block) and 'realtime_factor' (budget / mean
+                  total time; above 1.0 means the pipeline keeps up)
+        """
+        summary = {}
+        totals = None
+        for name, times in self.timings.items():
+            times_ms = np.array(times) * 1000
+            totals = times_ms if totals is None else totals + times_ms
+            summary[name] = _time_stats(times_ms)
+        summary['total'] = _time_stats(totals if totals is not None else np.zeros(0))
+        summary['budget_ms'] = self.latency_ms
+        mean_total = summary['total']['mean_ms']
+        summary['realtime_factor'] = (self.latency_ms / mean_total
+                                      if mean_total > 0 else float('inf'))
+        return summary
+
+    def print_report(self):
+        """Print the timing report as a table."""
+        summary = self.report()
+        print(f"{'Stage':8s} {'mean ms':>9s} {'p95 ms':>9s} {'max ms':>9s}")
+        for name in [stage.name for stage in self.stages] + ['total']:
+            stats = summary[name]
+            print(f"{name:8s} {stats['mean_ms']:9.3f} "
+                  f"{stats['p95_ms']:9.3f} {stats['max_ms']:9.3f}")
+        print(f"Budget per block: {summary['budget_ms']:.2f} ms "
+              f"({self.block_size} samples @ {self.rate} Hz)")
+        print(f"Real-time factor: {summary['realtime_factor']:.1f}x")
+
+
+def _time_stats(times_ms):
+    if len(times_ms) == 0:
+        return {'mean_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+    return {
+        'mean_ms': float(np.mean(times_ms)),
+        'p95_ms': float(np.percentile(times_ms, 95)),
+        'max_ms': float(np.max(times_ms)),
+    }
+
+
+def rms(data):
+    """Root-mean-square level of a signal."""
+    return float(np.sqrt(np.mean(data.astype(np.float64) ** 2)))
+
+
+def resample(data, rate, new_rate):
+    """Resample a (N,) or (N, channels) signal in the frequency domain.
+
+    The spectrum is zero-padded (upsampling) or truncated (downsampling, an
+    ideal low-pass at the new Nyquist frequency) and transformed back.
+    """
+    new_length = int(len(data) * new_rate / rate)
+    spectrum = np.fft.rfft(data, axis=0)
+    return np.fft.irfft(spectrum, n=new_length, axis=0) * (new_length / len(data))
+
+
+def demo(path, rates=(16000, 48000), block_ms=16.0):
+    """Denoise a WAV file at several sample rates and print timing reports."""
+    rate, data = wavfile.read(path)
+    data = to_float(data)
+    for target_rate in rates:
+        # Stereo input stays stereo: the pipeline's mono stage downmixes it
+        signal = data if target_rate == rate else resample(data, rate, target_rate)
+        block_size = int(target_rate * block_ms / 1000)
+        denoiser = StreamDenoiser(target_rate, block_size)
+        cleaned = denoiser.run(signal)
+        signal = downmix(signal)
+
+        # Skip the first half: detection warm-up and LMS convergence
+        tail = len(signal) // 2
+        hums = ', '.join(f"{f:.1f} Hz" for f in denoiser.notch.frequencies)
+        print(f"\n=== {path} @ {target_rate} Hz ===")
+        print(f"Hums tracked: {hums or 'none'}")
+        print(f"RMS (second half): {rms(signal[tail:]):.4f} -> "
+              f"{rms(cleaned[tail:]):.4f}")
+        denoiser.print_report()
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:] or [DATA_DIR / 'pure_hum.wav', DATA_DIR / 'mystery.wav']
+    for path in paths:
+        demo(path)